@@ -1,13 +1,28 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, g, has_app_context, has_request_context
+from flask.json.provider import DefaultJSONProvider
 import sqlite3
 import os
+import re
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import psycopg2
+import psycopg2.errors
 import psycopg2.extras
-from datetime import timedelta
+import psycopg2.pool
+from datetime import datetime, timedelta
 import time
 import logging
+import itertools
+import threading
+import queue
+import hmac
+from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
+from werkzeug.security import check_password_hash, generate_password_hash
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Configure logging
 logging.basicConfig(
@@ -16,7 +31,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify() / request.get_json() through orjson instead of the stdlib json module."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # FIX #1: Use environment variable for secret key
 app.secret_key = os.environ.get("SECRET_KEY")
@@ -24,7 +51,52 @@ if not app.secret_key:
     logger.error("SECRET_KEY environment variable not set!")
     raise ValueError("SECRET_KEY must be set in environment variables")
 
-API_TIMEOUT = 2.0  # seconds, tweak as you like
+API_TIMEOUT = (1.0, 2.0)  # (connect, read) seconds, tweak as you like
+
+# Shared HTTP session for the book APIs so repeated lookups reuse pooled
+# keep-alive connections instead of paying a TCP+TLS handshake per ISBN.
+# Each API host gets its own adapter pool, so the parallel Open Library and
+# Google Books requests of one lookup (and of the lookups that follow) each
+# reuse a warm connection to their host. Responses are gzip-compressed.
+# One quick retry covers dropped connections and transient gateway errors;
+# it is kept to one so a retried call still fits the preview's time budget.
+HTTP = requests.Session()
+HTTP.headers.update({"User-Agent": "my-book-library/1.0", "Accept-Encoding": "gzip"})
+_HTTP_RETRY = Retry(
+    total=1,
+    connect=1,
+    read=1,
+    backoff_factor=0.1,
+    status_forcelist=[502, 503, 504],
+    allowed_methods={"GET"},
+)
+for _prefix in ("https://openlibrary.org", "https://www.googleapis.com"):
+    HTTP.mount(_prefix, HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_HTTP_RETRY))
+
+# How long external lookup results stay in the isbn_cache / cover_cache tables
+LOOKUP_CACHE_TTL = 86400  # seconds
+
+# In-process LRU of recent lookups in front of isbn_cache. ISBNs neither API
+# knows about are remembered too, but only for LOOKUP_MISS_TTL.
+LOOKUP_MEMO_SIZE = 4096
+LOOKUP_MISS_TTL = 600  # seconds
+_LOOKUP_MEMO = OrderedDict()  # isbn -> (expires_at, (title, author, cover_url, genre))
+# Single-book API responses that carried an ETag, so a repeat request can
+# send If-None-Match. Only the small extracted result is kept, not the raw
+# payload; isbn_cache and the memo answer most repeats before this is reached.
+ETAG_CACHE_SIZE = 256
+_ETAG_CACHE = OrderedDict()  # (url, params) -> (etag, extracted result)
+_LOOKUP_MEMO_LOCK = threading.Lock()
+
+# Per-user index page stats, reused for a short while between book changes
+INDEX_CACHE_TTL = 30  # seconds
+_INDEX_CACHE = {}  # user_id -> (cached_at, (total, genre_rows, author_rows))
+_INDEX_CACHE_LOCK = threading.Lock()
+
+# Worker threads for running the Open Library / Google Books lookups side by
+# side: two per fetch_book_info call, sized for a few concurrent add-book
+# previews plus the enrichment thread in one web process
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
 
 app.permanent_session_lifetime = timedelta(days=30)
 
@@ -34,65 +106,377 @@ DB_PATH = os.path.join("db", "books.db")
 DATABASE_URL = os.environ.get("DATABASE_URL")
 USE_POSTGRES = bool(DATABASE_URL)
 
+# Set PG_PREPARED_STATEMENTS=1 to run hot queries as server-side prepared
+# statements on Postgres. Off by default: a transaction-mode pooler (such as
+# Supabase's on port 6543) hands each transaction whichever server
+# connection is free, so statements prepared on one aren't there on the next.
+# Only turn it on for direct or session-mode connections.
+USE_PREPARED_STATEMENTS = os.environ.get("PG_PREPARED_STATEMENTS", "0") == "1"
+
+
+class _PooledPgConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+# Pooled Postgres connections per worker process (Render requires SSL).
+# Once PG_POOL_MAX are out, callers wait up to PG_POOL_TIMEOUT for one.
+PG_POOL_MAX = int(os.environ.get("PG_POOL_MAX", 20))
+PG_POOL_TIMEOUT = 30  # seconds
+
+
+class _BlockingPgPool:
+    """ThreadedConnectionPool that waits for a free connection instead of raising PoolError."""
+
+    def __init__(self):
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            minconn=2,
+            maxconn=PG_POOL_MAX,
+            dsn=DATABASE_URL,
+            sslmode="require",
+            connection_factory=_PooledPgConnection,
+        )
+        self._slots = threading.BoundedSemaphore(PG_POOL_MAX)
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=PG_POOL_TIMEOUT):
+            raise psycopg2.pool.PoolError(
+                f"no free Postgres connection after {PG_POOL_TIMEOUT}s"
+            )
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close=False):
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+# Created on first use in each process, so forked workers don't share sockets
+_pg_pool = None
+_pg_pool_pid = None
+_PG_POOL_LOCK = threading.Lock()
+
+
+def _get_pg_pool():
+    global _pg_pool, _pg_pool_pid
+    pid = os.getpid()
+    if _pg_pool_pid != pid:
+        with _PG_POOL_LOCK:
+            if _pg_pool_pid != pid:
+                # An inherited pool is the parent's: leave it, open our own
+                _pg_pool = _BlockingPgPool()
+                _pg_pool_pid = pid
+    return _pg_pool
+
+
+def _close_pg_pool():
+    """Close this process's pool (e.g. after import-time init_db)."""
+    global _pg_pool, _pg_pool_pid
+    with _PG_POOL_LOCK:
+        if _pg_pool is not None and _pg_pool_pid == os.getpid():
+            _pg_pool.closeall()
+        _pg_pool = None
+        _pg_pool_pid = None
+
+
+STREAM_ITERSIZE = 1000  # rows per round trip for PostgresConnection.execute(stream=True)
+_STREAM_IDS = itertools.count()
+
 
 class PostgresConnection:
     """
     Small wrapper so Postgres behaves a bit like sqlite3.Connection:
     - .execute(query, params) returns a cursor with fetchone/fetchall
-    - .commit()
-    - .close()
+    - .executemany(query, seq_of_params)
+    - .commit() / .rollback()
+    - .close() hands the connection back to the pool
+
+    Rows are DictRows, which like sqlite3.Row support row["col"] and row[0]
+    but share one column index per cursor instead of building a dict per row.
     """
 
-    def __init__(self, dsn: str):
-        # Render Postgres generally requires SSL
-        self.conn = psycopg2.connect(dsn, sslmode="require")
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = pool.getconn()
 
-    def execute(self, query, params=()):
+    def execute(self, query, params=(), stream=False):
+        """
+        Run a query. With stream=True the rows come from a server-side
+        (named) cursor, fetched STREAM_ITERSIZE at a time as you iterate,
+        instead of all being loaded up front; use it for whole-table scans.
+        """
         # Convert sqlite-style "?" placeholders to psycopg2-style "%s"
         q = query.replace("?", "%s")
-        cur = self.conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        if stream:
+            cur = self.conn.cursor(name=f"stream_{id(self)}_{next(_STREAM_IDS)}",
+                                   cursor_factory=psycopg2.extras.DictCursor)
+            cur.itersize = STREAM_ITERSIZE
+        else:
+            cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         cur.execute(q, params)
         return cur
 
+    def executemany(self, query, seq_of_params):
+        q = query.replace("?", "%s")
+        cur = self.conn.cursor()
+        cur.executemany(q, seq_of_params)
+        return cur
+
+    def execute_prepared(self, name, query, params=()):
+        """Like execute(), but as named statement `name`, PREPAREd on first use (and again if the server lost it)."""
+        if not USE_PREPARED_STATEMENTS:
+            return self.execute(query, params)
+
+        idle = self.conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        try:
+            return self._execute_prepared(name, query, params)
+        except psycopg2.errors.InvalidSqlStatementName:
+            # Gone server-side; only retry when rolling back loses nothing
+            self.conn.prepared.discard(name)
+            if not idle:
+                raise
+            self.conn.rollback()
+            return self._execute_prepared(name, query, params)
+
+    def _execute_prepared(self, name, query, params):
+        if name not in self.conn.prepared:
+            numbers = iter(range(1, len(params) + 1))
+            pg_query = re.sub(r"\?", lambda _: f"${next(numbers)}", query)
+            self.conn.cursor().execute(f"PREPARE {name} AS {pg_query}")
+            # Only once the server has accepted it
+            self.conn.prepared.add(name)
+
+        cur = self.conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+        return cur
+
     def commit(self):
         self.conn.commit()
 
+    def rollback(self):
+        self.conn.rollback()
+
     def close(self):
-        self.conn.close()
+        if self.conn is None:
+            return
+        try:
+            # Never recycle a connection with an open (or aborted) transaction
+            if not self.conn.closed:
+                self.conn.rollback()
+        finally:
+            self.pool.putconn(self.conn, close=bool(self.conn.closed))
+            self.conn = None
+
+
+def execute_prepared(conn, name, query, params=()):
+    """
+    Run a hot query through a named prepared statement where the backend
+    supports it. sqlite3 already reuses compiled statements from its
+    per-connection statement cache, so SQLite just executes.
+    """
+    if isinstance(conn, PostgresConnection):
+        return conn.execute_prepared(name, query, params)
+    return conn.execute(query, params)
+
+
+# One long-lived SQLite handle per thread: reopening the database (and its
+# -wal/-shm files) on every request is a steady cost, and WAL lets each
+# thread's reader run alongside the single writer. Servers that start a new
+# thread per request (Werkzeug's threaded dev server) never reuse a handle,
+# so with SQLITE_CONN_PER_REQUEST set it is closed with each request instead.
+app.config["SQLITE_CONN_PER_REQUEST"] = os.environ.get("SQLITE_CONN_PER_REQUEST") == "1"
+_sqlite_conn = threading.local()
+
+
+def _sqlite_connection():
+    conn = getattr(_sqlite_conn, "conn", None)
+    if conn is not None:
+        return conn
+
+    os.makedirs("db", exist_ok=True)
+    # isolation_level=None: autocommit, writers open BEGIN IMMEDIATE themselves
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers and a writer work concurrently and needs fewer fsyncs;
+    # the rest keeps more of the database in memory.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    _sqlite_conn.conn = conn
+    return conn
+
+
+def _close_sqlite_connection():
+    """Close this thread's SQLite handle, if it has one."""
+    conn = getattr(_sqlite_conn, "conn", None)
+    _sqlite_conn.conn = None
+    if conn is not None:
+        conn.close()
+
+
+def _forget_sqlite_connection():
+    # A SQLite handle must not be used across fork(): the child drops the one
+    # it inherited (without closing it, which would touch the parent's
+    # locks) and opens its own on first use
+    _sqlite_conn.conn = None
+
+
+os.register_at_fork(after_in_child=_forget_sqlite_connection)
+
+
+
+def _open_connection():
+    if USE_POSTGRES:
+        return PostgresConnection(_get_pg_pool())
+
+    # Default: local SQLite (no env var set)
+    return _sqlite_connection()
+
+
+def _release_connection(conn):
+    """Give a Postgres connection back to the pool; SQLite handles stay open."""
+    if isinstance(conn, PostgresConnection):
+        conn.close()
+    elif conn.in_transaction:
+        conn.rollback()
 
 
 # FIX #4: Add context manager for automatic connection cleanup
 @contextmanager
 def get_db_connection():
-    """Return a connection with row access by column name. Auto-closes on exit."""
+    """
+    Return a connection with row access by column name.
+
+    Inside a request, the connection (pooled for Postgres) is opened once and
+    shared by every block; teardown_appcontext releases it.
+    Otherwise the connection is closed on exit.
+    """
+    request_scoped = has_app_context()
     conn = None
     try:
-        if USE_POSTGRES:
-            conn = PostgresConnection(DATABASE_URL)
+        if request_scoped:
+            conn = g.get("db_conn")
+            if conn is None:
+                conn = g.db_conn = _open_connection()
+                g.db_close_thread_conn = not USE_POSTGRES and app.config["SQLITE_CONN_PER_REQUEST"]
         else:
-            # Default: local SQLite (no env var set)
-            os.makedirs("db", exist_ok=True)
-            conn = sqlite3.connect(DB_PATH)
-            conn.row_factory = sqlite3.Row
+            conn = _open_connection()
 
         yield conn
 
     except Exception as e:
         logger.error(f"Database connection error: {e}", exc_info=True)
-        if conn:
+        if conn and request_scoped:
             try:
-                conn.close()
-            except:
+                conn.rollback()
+            except Exception:
                 pass
         raise
     finally:
-        if conn:
+        if conn and not request_scoped:
             try:
-                conn.close()
+                _release_connection(conn)
             except Exception as e:
                 logger.error(f"Error closing connection: {e}")
 
 
+@app.teardown_appcontext
+def close_db_connection(exc):
+    """Release the request's database connection, if one was opened."""
+    release_request_connection()
+
+
+def release_request_connection():
+    """Hand the request's connection back now (e.g. before slow network calls); the next block reopens one."""
+    if not has_app_context():
+        return
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        try:
+            _release_connection(conn)
+            if g.pop("db_close_thread_conn", False):
+                _close_sqlite_connection()
+        except Exception as e:
+            logger.error(f"Error closing connection: {e}")
+
+
+
+@contextmanager
+def write_transaction(conn):
+    """
+    Run a block of writes as one transaction: committed on success, rolled
+    back on error. SQLite takes the write lock up front (BEGIN IMMEDIATE) so
+    the transaction can't fail halfway through on a lock upgrade.
+    """
+    if not isinstance(conn, PostgresConnection):
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+# Per-user totals for the index page: one ('total', ''), ('genre', genre_label)
+# and ('author', author) row each, maintained by triggers on books.
+SQL_CREATE_BOOK_COUNTS = """
+    CREATE TABLE IF NOT EXISTS book_counts (
+        user_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        label TEXT NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (user_id, kind, label)
+    )
+"""
+SQL_REBUILD_BOOK_COUNTS = """
+    INSERT INTO book_counts (user_id, kind, label, n)
+    SELECT user_id, 'total', '', COUNT(*) FROM books GROUP BY user_id
+    UNION ALL
+    SELECT user_id, 'genre', genre_label, COUNT(*) FROM books GROUP BY user_id, genre_label
+    UNION ALL
+    SELECT user_id, 'author', COALESCE(author, ''), COUNT(*) FROM books GROUP BY user_id, COALESCE(author, '')
+"""
+
+
+def _count_book_sql(ref):
+    """Statement adding `ref` (NEW/OLD row) to book_counts."""
+    return f"""
+        INSERT INTO book_counts (user_id, kind, label, n)
+        VALUES ({ref}.user_id, 'total', '', 1),
+               ({ref}.user_id, 'genre', {ref}.genre_label, 1),
+               ({ref}.user_id, 'author', COALESCE({ref}.author, ''), 1)
+        ON CONFLICT (user_id, kind, label) DO UPDATE SET n = book_counts.n + 1;
+    """
+
+
+def _uncount_book_sql(ref):
+    """Statements removing `ref` (NEW/OLD row) from book_counts."""
+    return f"""
+        UPDATE book_counts SET n = n - 1
+        WHERE user_id = {ref}.user_id
+          AND (kind, label) IN (VALUES ('total', ''),
+                                       ('genre', {ref}.genre_label),
+                                       ('author', COALESCE({ref}.author, '')));
+        DELETE FROM book_counts WHERE user_id = {ref}.user_id AND n <= 0;
+    """
+
+
 def init_db():
     """Create / migrate DB schema for either SQLite or Postgres."""
     with get_db_connection() as conn:
@@ -128,6 +512,77 @@ def init_db():
             conn.execute("CREATE INDEX IF NOT EXISTS idx_books_added_at ON books(added_at DESC)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_books_user_id ON books(user_id)")
 
+            # Every listing is scoped to one user, so lead with user_id, and
+            # end with the (added_at, id) keyset so a page is a short range scan
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_books_user_author_added ON books(user_id, author, added_at DESC, id DESC)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_user_added_id ON books(user_id, added_at DESC, id DESC)")
+
+            # Display genre ("Uncategorized" when blank), materialized so
+            # genre lookups are a plain index seek
+            conn.execute("""
+                ALTER TABLE books ADD COLUMN IF NOT EXISTS genre_label TEXT
+                GENERATED ALWAYS AS (COALESCE(NULLIF(TRIM(genre), ''), 'Uncategorized')) STORED
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_books_genre_label_added ON books(user_id, genre_label, added_at DESC, id DESC)"
+            )
+
+            # Trigram index so the ILIKE '%term%' search on /books?q= can use
+            # an index instead of scanning
+            conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_books_search_trgm ON books
+                USING GIN (title gin_trgm_ops, author gin_trgm_ops, isbn gin_trgm_ops)
+            """)
+
+            # Index page counters, kept in step with books by a trigger
+            counts_exist = conn.execute("SELECT to_regclass('book_counts') AS t").fetchone()["t"]
+            conn.execute(SQL_CREATE_BOOK_COUNTS)
+            conn.execute(f"""
+                CREATE OR REPLACE FUNCTION book_counts_sync() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                        {_uncount_book_sql("OLD")}
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        {_count_book_sql("NEW")}
+                    END IF;
+                    RETURN NULL;
+                END
+                $$ LANGUAGE plpgsql
+            """)
+            conn.execute("DROP TRIGGER IF EXISTS book_counts_sync ON books")
+            conn.execute("""
+                CREATE TRIGGER book_counts_sync
+                AFTER INSERT OR DELETE OR UPDATE OF genre, author, user_id ON books
+                FOR EACH ROW EXECUTE FUNCTION book_counts_sync()
+            """)
+            if not counts_exist:
+                conn.execute(SQL_REBUILD_BOOK_COUNTS)
+
+            # Cache of external API lookups (shared by all users)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS isbn_cache (
+                    isbn TEXT PRIMARY KEY,
+                    title TEXT,
+                    author TEXT,
+                    cover_url TEXT,
+                    genre TEXT,
+                    fetched_at DOUBLE PRECISION NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cover_cache (
+                    title TEXT NOT NULL,
+                    author TEXT NOT NULL DEFAULT '',
+                    cover_url TEXT,
+                    fetched_at DOUBLE PRECISION NOT NULL,
+                    PRIMARY KEY (title, author)
+                )
+            """)
+
             conn.commit()
         else:
             # SQLite schema
@@ -161,6 +616,105 @@ def init_db():
             conn.execute("CREATE INDEX IF NOT EXISTS idx_books_added_at ON books(added_at DESC)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_books_user_id ON books(user_id)")
 
+            # Every listing is scoped to one user, so lead with user_id, and
+            # end with the (added_at, id) keyset so a page is a short range scan
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_books_user_author_added ON books(user_id, author, added_at DESC, id DESC)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_books_user_added_id ON books(user_id, added_at DESC, id DESC)")
+
+            # Display genre ("Uncategorized" when blank), as a generated column
+            # so genre lookups are a plain index seek. table_xinfo (unlike
+            # table_info) lists generated columns.
+            columns = {row["name"] for row in conn.execute("PRAGMA table_xinfo(books)")}
+            if "genre_label" not in columns:
+                conn.execute("""
+                    ALTER TABLE books ADD COLUMN genre_label TEXT
+                    GENERATED ALWAYS AS (COALESCE(NULLIF(TRIM(genre), ''), 'Uncategorized')) VIRTUAL
+                """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_books_genre_label_added ON books(user_id, genre_label, added_at DESC, id DESC)"
+            )
+
+            # Full-text search over title/author/isbn for /books?q=,
+            # kept in sync with books by triggers
+            fts_exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books_fts'"
+            ).fetchone()
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS books_fts
+                USING fts5(title, author, isbn, content='books', content_rowid='id')
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+                    INSERT INTO books_fts (rowid, title, author, isbn)
+                    VALUES (new.id, new.title, new.author, new.isbn);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+                    INSERT INTO books_fts (books_fts, rowid, title, author, isbn)
+                    VALUES ('delete', old.id, old.title, old.author, old.isbn);
+                END
+            """)
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, isbn ON books BEGIN
+                    INSERT INTO books_fts (books_fts, rowid, title, author, isbn)
+                    VALUES ('delete', old.id, old.title, old.author, old.isbn);
+                    INSERT INTO books_fts (rowid, title, author, isbn)
+                    VALUES (new.id, new.title, new.author, new.isbn);
+                END
+            """)
+            if not fts_exists:
+                # Index books that were added before the FTS table existed
+                conn.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+            # Index page counters, kept in step with books by triggers
+            with write_transaction(conn):
+                counts_exist = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'book_counts'"
+                ).fetchone()
+                conn.execute(SQL_CREATE_BOOK_COUNTS)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS book_counts_ai AFTER INSERT ON books BEGIN
+                        {_count_book_sql("new")}
+                    END
+                """)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS book_counts_ad AFTER DELETE ON books BEGIN
+                        {_uncount_book_sql("old")}
+                    END
+                """)
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS book_counts_au AFTER UPDATE OF genre, author, user_id ON books BEGIN
+                        {_uncount_book_sql("old")}
+                        {_count_book_sql("new")}
+                    END
+                """)
+                if not counts_exist:
+                    conn.execute(SQL_REBUILD_BOOK_COUNTS)
+
+            # Cache of external API lookups (shared by all users)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS isbn_cache (
+                    isbn TEXT PRIMARY KEY,
+                    title TEXT,
+                    author TEXT,
+                    cover_url TEXT,
+                    genre TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cover_cache (
+                    title TEXT NOT NULL,
+                    author TEXT NOT NULL DEFAULT '',
+                    cover_url TEXT,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (title, author)
+                )
+            """)
+
             conn.commit()
 
     logger.info("Database initialized successfully")
@@ -176,99 +730,130 @@ def require_login(func):
     return wrapper
 
 
+# Controlled genre set we care about
+GENRES = (
+    "Crime",
+    "Comedy",
+    "Thriller",
+    "Fantasy",
+    "Science Fiction",
+    "Horror",
+    "Mystery",
+    "Romance",
+    "Young Adult",
+    "Poetry",
+    "Biography",
+    "History",
+    "Philosophy",
+    "Self-Help",
+    "Business",
+    "Literary Fiction",
+    "Non-Fiction",
+    "Anthology",
+)
+
+# Choices offered in the edit form
+GENRE_CHOICES = GENRES + ("Uncategorized",)
+
+# Lowercased genre name -> controlled genre, for subjects that already are one
+_GENRE_BY_NAME = {g.lower(): g for g in GENRES}
+
+# Subjects too broad to use as a genre on their own
+_GENERIC_SUBJECTS = frozenset({"fiction", "nonfiction", "literature", "juvenile fiction", "juvenile nonfiction"})
+
+# Prioritised genre rules used by _normalize_genre: the first rule with a
+# keyword anywhere in the subjects/title/description wins.
+_GENRE_RULES = (
+    ("Crime", ("crime", "detective", "police", "noir", "murder")),
+    ("Comedy", ("comedy", "humor", "humour", "comedic", "satire", "parody")),
+    ("Thriller", ("thriller", "suspense", "conspiracy")),
+    ("Fantasy", ("fantasy", "magic", "dragon", "wizard", "mythical")),
+    ("Science Fiction", ("science fiction", "sci-fi", "sci fi", "space", "dystopian", "post-apocalyptic", "cyberpunk")),
+    ("Horror", ("horror", "ghost", "haunted", "supernatural", "vampire")),
+    ("Mystery", ("mystery", "whodunit", "detective story")),
+    ("Romance", ("romance", "love story", "romantic")),
+    ("Young Adult", ("young adult", "ya", "teen fiction", "adolescent")),
+    ("Poetry", ("poetry", "poem", "verse")),
+    ("Biography", ("biography", "memoir", "autobiography")),
+    ("History", ("history", "historical")),
+    ("Philosophy", ("philosophy", "existentialism", "ethics", "metaphysics")),
+    ("Self-Help", ("self-help", "self help", "personal growth", "motivation")),
+    ("Business", ("business", "management", "leadership", "entrepreneur", "economics")),
+    ("Anthology", ("anthology", "collection", "short stories", "compiled")),
+    # If it's fiction but we couldn't classify → Literary Fiction
+    ("Literary Fiction", ("fiction",)),
+    # Non-fiction catch-all
+    ("Non-Fiction", ("language", "culture", "society", "politics", "essays", "social life", "reportage")),
+)
+
+# Flattened (keyword, genre) pairs in priority order, built once at import
+_GENRE_KEYWORDS = tuple((word, genre) for genre, words in _GENRE_RULES for word in words)
+
+
 def _normalize_genre(subjects, title=None, description=None):
     """
     Map messy subjects/title/description into a small, clean set of genres.
     Returns one of a controlled list, or None if nothing fits.
     """
 
-    # Controlled genre set we care about
-    GENRES = [
-        "Crime",
-        "Comedy",
-        "Thriller",
-        "Fantasy",
-        "Science Fiction",
-        "Horror",
-        "Mystery",
-        "Romance",
-        "Young Adult",
-        "Poetry",
-        "Biography",
-        "History",
-        "Philosophy",
-        "Self-Help",
-        "Business",
-        "Literary Fiction",
-        "Non-Fiction",
-        "Anthology",
-    ]
-
     title = (title or "").lower()
     description = (description or "").lower()
     subjects = [s.lower() for s in (subjects or [])]
 
-    text = " ".join(subjects + [title, description])
-
-    def has(*words):
-        return any(w in text for w in words)
-
-    # Prioritised rules
-    if has("crime", "detective", "police", "noir", "murder"):
-        return "Crime"
-    if has("comedy", "humor", "humour", "comedic", "satire", "parody"):
-        return "Comedy"
-    if has("thriller", "suspense", "conspiracy"):
-        return "Thriller"
-    if has("fantasy", "magic", "dragon", "wizard", "mythical"):
-        return "Fantasy"
-    if has("science fiction", "sci-fi", "sci fi", "space", "dystopian", "post-apocalyptic", "cyberpunk"):
-        return "Science Fiction"
-    if has("horror", "ghost", "haunted", "supernatural", "vampire"):
-        return "Horror"
-    if has("mystery", "whodunit", "detective story"):
-        return "Mystery"
-    if has("romance", "love story", "romantic"):
-        return "Romance"
-    if has("young adult", "ya", "teen fiction", "adolescent"):
-        return "Young Adult"
-    if has("poetry", "poem", "verse"):
-        return "Poetry"
-    if has("biography", "memoir", "autobiography"):
-        return "Biography"
-    if has("history", "historical"):
-        return "History"
-    if has("philosophy", "existentialism", "ethics", "metaphysics"):
-        return "Philosophy"
-    if has("self-help", "self help", "personal growth", "motivation"):
-        return "Self-Help"
-    if has("business", "management", "leadership", "entrepreneur", "economics"):
-        return "Business"
-    if has("anthology", "collection", "short stories", "compiled"):
-        return "Anthology"
+    # A subject that is already one of our genres (e.g. "Fantasy") wins outright
+    for s in subjects:
+        if s in _GENRE_BY_NAME:
+            return _GENRE_BY_NAME[s]
 
-    # If it's fiction but we couldn't classify → Literary Fiction
-    if has("fiction"):
-        return "Literary Fiction"
+    text = " ".join((*subjects, title, description))
 
-    # Non-fiction catch-all
-    if has("language", "culture", "society", "politics", "essays", "social life", "reportage"):
-        return "Non-Fiction"
+    # First keyword (in priority order) found anywhere in the text wins
+    for word, genre in _GENRE_KEYWORDS:
+        if word in text:
+            return genre
 
     # Last fallback: pick a non-generic subject
-    GENERIC = {"fiction", "nonfiction", "literature", "juvenile fiction", "juvenile nonfiction"}
     for s in subjects:
-        if s not in GENERIC:
+        if s not in _GENERIC_SUBJECTS:
             return s.title()
 
     return None
 
 
-def _fetch_from_openlibrary(isbn: str):
+def _get_json(url: str, params: dict, extract=None):
+    """GET and parse a JSON API response; with `extract`, return extract(data), kept for If-None-Match by ETag."""
+    key = (url, tuple(sorted(params.items())))
+    seen = None
+    if extract is not None:
+        with _LOOKUP_MEMO_LOCK:
+            seen = _ETAG_CACHE.get(key)
+
+    headers = {"If-None-Match": seen[0]} if seen else None
+    resp = HTTP.get(url, params=params, timeout=API_TIMEOUT, headers=headers)
+    if seen and resp.status_code == 304:
+        return seen[1]
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    if extract is None:
+        return data
+
+    result = extract(data)
+    etag = resp.headers.get("ETag")
+    if etag:
+        with _LOOKUP_MEMO_LOCK:
+            _ETAG_CACHE[key] = (etag, result)
+            _ETAG_CACHE.move_to_end(key)
+            if len(_ETAG_CACHE) > ETAG_CACHE_SIZE:
+                _ETAG_CACHE.popitem(last=False)
+    return result
+
+
+def _fetch_from_openlibrary(isbn: str, strict: bool = False):
     """
     Try to fetch metadata from Open Library.
     Returns dict with keys: title, authors(list), cover_url, subjects(list), description(str or None).
-    Or None if nothing found.
+    Or None if nothing found. A failed request is logged and also returns
+    None, unless strict=True, which lets the error propagate instead.
     """
     try:
         url = "https://openlibrary.org/api/books"
@@ -277,87 +862,143 @@ def _fetch_from_openlibrary(isbn: str):
             "format": "json",
             "jscmd": "data",
         }
-        resp = requests.get(url, params=params, timeout=API_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
         key = f"ISBN:{isbn}"
-        if key not in data:
-            return None
-
-        entry = data[key]
-        title = entry.get("title")
-        authors = [a.get("name") for a in entry.get("authors", []) if a.get("name")]
-        cover = entry.get("cover") or {}
-        cover_url = cover.get("medium") or cover.get("large") or cover.get("small")
-        subjects = [s.get("name") for s in entry.get("subjects", []) if s.get("name")]
-
-        description = entry.get("description")
-        if isinstance(description, dict):
-            description = description.get("value")
-        elif not isinstance(description, str):
-            description = None
-
-        return {
-            "title": title,
-            "authors": authors,
-            "cover_url": cover_url,
-            "subjects": subjects,
-            "description": description,
-        }
+        return _get_json(
+            url, params,
+            extract=lambda data: _parse_openlibrary_entry(data[key]) if key in data else None,
+        )
 
     except Exception as e:
+        if strict:
+            raise
         # FIX #5: Proper logging instead of print
         logger.error(f"Open Library error for ISBN {isbn}: {e}", exc_info=True)
         return None
 
 
-def _fetch_from_googlebooks(isbn: str):
+OPENLIBRARY_BATCH_SIZE = 50  # ISBNs per bibkeys request
+
+
+def _fetch_openlibrary_batch(isbns):
+    """
+    Look up several ISBNs in one Open Library request (bibkeys accepts a
+    comma-separated list). Returns {isbn: metadata dict} for the ISBNs it
+    found, in the same shape as _fetch_from_openlibrary.
+    """
+    try:
+        url = "https://openlibrary.org/api/books"
+        params = {
+            "bibkeys": ",".join(f"ISBN:{isbn}" for isbn in isbns),
+            "format": "json",
+            "jscmd": "data",
+        }
+        data = _get_json(url, params)
+        return {
+            isbn: _parse_openlibrary_entry(data[f"ISBN:{isbn}"])
+            for isbn in isbns
+            if f"ISBN:{isbn}" in data
+        }
+
+    except Exception as e:
+        logger.error(f"Open Library batch error for {len(isbns)} ISBNs: {e}", exc_info=True)
+        return {}
+
+
+def _parse_openlibrary_entry(entry):
+    """Turn one Open Library jscmd=data record into our metadata dict."""
+    title = entry.get("title")
+    authors = [a.get("name") for a in entry.get("authors", []) if a.get("name")]
+    cover = entry.get("cover") or {}
+    cover_url = cover.get("medium") or cover.get("large") or cover.get("small")
+    subjects = [s.get("name") for s in entry.get("subjects", []) if s.get("name")]
+
+    description = entry.get("description")
+    if isinstance(description, dict):
+        description = description.get("value")
+    elif not isinstance(description, str):
+        description = None
+
+    return {
+        "title": title,
+        "authors": authors,
+        "cover_url": cover_url,
+        "subjects": subjects,
+        "description": description,
+    }
+
+
+def _fetch_from_googlebooks(isbn: str, strict: bool = False):
     """
     Fallback to Google Books if Open Library doesn't have useful info.
-    Returns dict similar to _fetch_from_openlibrary.
+    Returns dict similar to _fetch_from_openlibrary (strict works the same).
     """
     try:
         url = "https://www.googleapis.com/books/v1/volumes"
         params = {"q": f"isbn:{isbn}"}
-        resp = requests.get(url, params=params, timeout=API_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-
-        items = data.get("items")
-        if not items:
-            return None
-
-        volume_info = items[0].get("volumeInfo", {})
-        title = volume_info.get("title")
-        authors = volume_info.get("authors") or []
-        image_links = volume_info.get("imageLinks") or {}
-        cover_url = (
-                image_links.get("thumbnail")
-                or image_links.get("smallThumbnail")
-        )
-        # Google categories are coarser, but we can still use them as subjects
-        subjects = volume_info.get("categories") or []
-        description = volume_info.get("description")
-
-        return {
-            "title": title,
-            "authors": authors,
-            "cover_url": cover_url,
-            "subjects": subjects,
-            "description": description,
-        }
+        return _get_json(url, params, extract=_parse_googlebooks_volumes)
 
     except Exception as e:
+        if strict:
+            raise
         # FIX #5: Proper logging instead of print
         logger.error(f"Google Books error for ISBN {isbn}: {e}", exc_info=True)
         return None
 
 
+def _parse_googlebooks_volumes(data):
+    """Turn a Google Books volumes search into our metadata dict (first hit), or None."""
+    items = data.get("items")
+    if not items:
+        return None
+
+    volume_info = items[0].get("volumeInfo", {})
+    title = volume_info.get("title")
+    authors = volume_info.get("authors") or []
+    image_links = volume_info.get("imageLinks") or {}
+    cover_url = (
+            image_links.get("thumbnail")
+            or image_links.get("smallThumbnail")
+    )
+    # Google categories are coarser, but we can still use them as subjects
+    subjects = volume_info.get("categories") or []
+    description = volume_info.get("description")
+
+    return {
+        "title": title,
+        "authors": authors,
+        "cover_url": cover_url,
+        "subjects": subjects,
+        "description": description,
+    }
+
+
+def _first_googlebooks_cover(data):
+    """The first cover URL among a Google Books volumes search's results, or None."""
+    for item in data.get("items") or []:
+        image_links = item.get("volumeInfo", {}).get("imageLinks") or {}
+        cover_url = image_links.get("thumbnail") or image_links.get("smallThumbnail")
+        if cover_url:
+            return cover_url
+    return None
+
+
 def fetch_cover_by_title_author(title: str, author: str | None = None):
     """
     Try to fetch a cover image using title + optional author via Google Books.
-    Returns a cover URL or None.
+    Returns a cover URL or None. Hits are cached in the cover_cache table.
     """
+    cache_key = (title, author or "")
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT cover_url FROM cover_cache WHERE title = ? AND author = ? AND fetched_at > ?",
+                cache_key + (time.time() - LOOKUP_CACHE_TTL,)
+            ).fetchone()
+        if row and row["cover_url"]:
+            return row["cover_url"]
+    except Exception as e:
+        logger.error(f"Error checking cover cache for '{title}' / '{author}': {e}", exc_info=True)
+
     try:
         q = f'intitle:{title}'
         if author:
@@ -368,22 +1009,17 @@ def fetch_cover_by_title_author(title: str, author: str | None = None):
             "q": q,
             "maxResults": 5,
         }
-        resp = requests.get(url, params=params, timeout=API_TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-
-        items = data.get("items") or []
-        for item in items:
-            info = item.get("volumeInfo", {})
-            image_links = info.get("imageLinks") or {}
-            cover_url = (
-                    image_links.get("thumbnail")
-                    or image_links.get("smallThumbnail")
-            )
-            if cover_url:
-                return cover_url
-
-        return None
+        cover_url = _get_json(url, params, extract=_first_googlebooks_cover)
+        if cover_url:
+            with get_db_connection() as conn:
+                conn.execute("""
+                    INSERT INTO cover_cache (title, author, cover_url, fetched_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT (title, author) DO UPDATE
+                    SET cover_url = excluded.cover_url, fetched_at = excluded.fetched_at
+                """, cache_key + (cover_url, time.time()))
+                conn.commit()
+        return cover_url
 
     except Exception as e:
         # FIX #5: Proper logging
@@ -391,28 +1027,34 @@ def fetch_cover_by_title_author(title: str, author: str | None = None):
         return None
 
 
+@lru_cache(maxsize=8192)  # the same authors come back for many ISBNs
 def normalize_author_name(name: str) -> str:
     """Normalize author strings like 'Christie, Agatha' -> 'Agatha Christie'."""
     name = (name or "").strip()
 
     # If it's "Last, First"
-    if "," in name:
-        parts = [p.strip() for p in name.split(",", 1)]
-        if len(parts) == 2 and parts[0] and parts[1]:
-            last, first = parts
-            return f"{first} {last}"
+    idx = name.find(",")
+    if idx < 0:
+        return name
+    last = name[:idx].rstrip()
+    first = name[idx + 1:].lstrip()
+    return f"{first} {last}" if first and last else name
+
 
-    return name
+SQL_BOOK_BY_ISBN = "SELECT title, author, cover_url, genre FROM books WHERE isbn = ? AND user_id = ?"
 
 
 def get_book_from_db_by_isbn(isbn: str):
+    # Scripts (e.g. backfill_covers.py) call fetch_book_info with no request/user
+    if not has_request_context():
+        return None
     user_id = session.get("user_id")  # ADD THIS LINE
     if not user_id:
         return None
 
     with get_db_connection() as conn:
-        row = conn.execute(
-            "SELECT title, author, cover_url, genre FROM books WHERE isbn = ? AND user_id = ?",
+        row = execute_prepared(
+            conn, "book_by_isbn", SQL_BOOK_BY_ISBN,
             (isbn, user_id)  # ADD user_id FILTER
         ).fetchone()
 
@@ -427,12 +1069,72 @@ def get_book_from_db_by_isbn(isbn: str):
         }
 
 
+def get_cached_lookup(isbn: str):
+    """Return a fresh isbn_cache entry for this ISBN, or None."""
+    with get_db_connection() as conn:
+        row = conn.execute(
+            "SELECT title, author, cover_url, genre FROM isbn_cache WHERE isbn = ? AND fetched_at > ?",
+            (isbn, time.time() - LOOKUP_CACHE_TTL)
+        ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            "title": row["title"],
+            "author": row["author"],
+            "cover_url": row["cover_url"],
+            "genre": row["genre"],
+        }
+
+
+def store_cached_lookup(isbn: str, title, author, cover_url, genre):
+    """Insert or refresh the isbn_cache entry for this ISBN."""
+    with get_db_connection() as conn:
+        conn.execute("""
+            INSERT INTO isbn_cache (isbn, title, author, cover_url, genre, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (isbn) DO UPDATE
+            SET title = excluded.title,
+                author = excluded.author,
+                cover_url = excluded.cover_url,
+                genre = excluded.genre,
+                fetched_at = excluded.fetched_at
+        """, (isbn, title, author, cover_url, genre, time.time()))
+        conn.commit()
+
+
+def _recall_lookup(isbn: str):
+    """Return the memoized fetch_book_info result for this ISBN, or None."""
+    with _LOOKUP_MEMO_LOCK:
+        entry = _LOOKUP_MEMO.get(isbn)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.time():
+            del _LOOKUP_MEMO[isbn]
+            return None
+        _LOOKUP_MEMO.move_to_end(isbn)
+        return result
+
+
+def _remember_lookup(isbn: str, result, ttl=LOOKUP_CACHE_TTL):
+    with _LOOKUP_MEMO_LOCK:
+        _LOOKUP_MEMO[isbn] = (time.time() + ttl, result)
+        _LOOKUP_MEMO.move_to_end(isbn)
+        if len(_LOOKUP_MEMO) > LOOKUP_MEMO_SIZE:
+            _LOOKUP_MEMO.popitem(last=False)
+
+
 def fetch_book_info(isbn: str):
     """
     Fetch book title, author, cover, and genre.
 
-    0. Check local DB (cache) first.
-    1. Then external APIs if needed.
+    0. Check local caches first: the user's own books, the in-process memo,
+       then isbn_cache.
+    1. Then external APIs if needed, remembering the answer in isbn_cache
+       (and a miss in the memo, for a shorter while, but only when both
+       APIs really answered "not found": a failed request isn't a miss).
     """
 
     # 0) Local DB cache
@@ -445,18 +1147,64 @@ def fetch_book_info(isbn: str):
                 cached["cover_url"],
                 cached["genre"],
             )
+
+        remembered = _recall_lookup(isbn)
+        if remembered:
+            return remembered
+
+        cached = get_cached_lookup(isbn)
+        if cached:
+            result = (cached["title"], cached["author"], cached["cover_url"], cached["genre"])
+            _remember_lookup(isbn, result)
+            return result
     except Exception as e:
         logger.error(f"Error checking DB cache for ISBN {isbn}: {e}", exc_info=True)
 
-    # 1) External APIs
-    meta = _fetch_from_openlibrary(isbn)
+    # Don't keep a pooled connection checked out (idle in transaction) while
+    # waiting on the APIs; the cache write below takes a fresh one
+    release_request_connection()
+
+    # 1) External APIs, queried in parallel: the first useful answer wins and
+    #    the other one only fills gaps if it has already finished.
+    meta = None
+    failed = False  # did any API error out rather than answer "not found"?
+    pending = {
+        EXECUTOR.submit(_fetch_from_openlibrary, isbn, strict=True),
+        EXECUTOR.submit(_fetch_from_googlebooks, isbn, strict=True),
+    }
+    for future in as_completed(pending):
+        pending.discard(future)
+        try:
+            result = future.result()
+        except requests.HTTPError as e:
+            # A 404 is a definite "no such book"; any other status isn't
+            if e.response is None or e.response.status_code != 404:
+                logger.error(f"Lookup error for ISBN {isbn}: {e}", exc_info=True)
+                failed = True
+            continue
+        except Exception as e:
+            logger.error(f"Lookup error for ISBN {isbn}: {e}", exc_info=True)
+            failed = True
+            continue
+        if not result:
+            continue
+
+        if meta is None:
+            meta = dict(result)
+        else:
+            meta.update({k: v for k, v in result.items() if v and not meta.get(k)})
 
-    if not meta:
-        meta = _fetch_from_googlebooks(isbn)
+        if not any(f.done() for f in pending):
+            for f in pending:
+                f.cancel()
+            break
 
     if not meta:
         # Nothing found anywhere
-        return "Unknown title", "Unknown author", None, None
+        result = ("Unknown title", "Unknown author", None, None)
+        if not failed:
+            _remember_lookup(isbn, result, ttl=LOOKUP_MISS_TTL)
+        return result
 
     title = meta.get("title") or "Unknown title"
     authors = meta.get("authors") or []
@@ -468,7 +1216,14 @@ def fetch_book_info(isbn: str):
 
     genre = _normalize_genre(subjects, title=title, description=description)
 
-    return title, author_str, cover_url, genre
+    try:
+        store_cached_lookup(isbn, title, author_str, cover_url, genre)
+    except Exception as e:
+        logger.error(f"Error caching lookup for ISBN {isbn}: {e}", exc_info=True)
+
+    result = (title, author_str, cover_url, genre)
+    _remember_lookup(isbn, result)
+    return result
 
 
 # FIX #3: Health check endpoint
@@ -485,6 +1240,35 @@ def health():
         return jsonify({"status": "unhealthy", "error": str(e)}), 503
 
 
+SQL_LOGIN_LOOKUP = "SELECT id, username, password, role FROM users WHERE username=?"
+
+
+def _verify_password(conn, user, password) -> bool:
+    """
+    Check a login attempt against the user's stored password hash.
+
+    Accounts that still hold a plaintext password (created before hashing)
+    are compared in constant time and upgraded to a hash on success.
+    """
+    stored = user["password"] or ""
+    if not password:
+        return False
+
+    if stored.startswith(("scrypt:", "pbkdf2:")):
+        return check_password_hash(stored, password)
+
+    if hmac.compare_digest(stored.encode(), password.encode()):
+        conn.execute(
+            "UPDATE users SET password=? WHERE id=?",
+            (generate_password_hash(password), user["id"])
+        )
+        conn.commit()
+        logger.info(f"Upgraded stored password for user {user['username']} to a hash")
+        return True
+
+    return False
+
+
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -493,12 +1277,9 @@ def login():
 
         try:
             with get_db_connection() as conn:
-                user = conn.execute(
-                    "SELECT * FROM users WHERE username=? AND password=?",
-                    (username, password)
-                ).fetchone()
+                user = execute_prepared(conn, "login_lookup", SQL_LOGIN_LOOKUP, (username,)).fetchone()
 
-                if user:
+                if user and _verify_password(conn, user, password):
                     session.permanent = True
                     session["user"] = user["username"]
                     session["user_id"] = user["id"]  # ADD THIS LINE
@@ -515,53 +1296,153 @@ def login():
     return render_template("login.html")
 
 
+SQL_LIBRARY_STATS = "SELECT kind, label, n FROM book_counts WHERE user_id = ? ORDER BY kind, n DESC, label ASC"
+
+
+def _load_library_stats(user_id):
+    """
+    Return (total, genre_rows, author_rows) for the index page.
+
+    Read from the book_counts table, which triggers keep up to date, so this
+    touches one row per genre/author instead of scanning the user's books.
+    """
+    with get_db_connection() as conn:
+        rows = execute_prepared(conn, "library_stats", SQL_LIBRARY_STATS, (user_id,)).fetchall()
+
+    total = 0
+    genre_rows = []
+    author_rows = []
+    for row in rows:
+        if row["kind"] == "total":
+            total = row["n"]
+        elif row["kind"] == "genre":
+            genre_rows.append({"genre_label": row["label"], "count": row["n"]})
+        else:
+            author_rows.append({"author": row["label"], "count": row["n"]})
+
+    return total, genre_rows, author_rows
+
+
+def _invalidate_index_cache(user_id):
+    """Drop the cached index page stats after this user's books change."""
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE.pop(user_id, None)
+
+
 @app.route("/")
 @require_login
 def index():
     try:
         user_id = session.get("user_id")  # ADD THIS LINE
 
-        with get_db_connection() as conn:
-            # Total books for this user
-            total_row = conn.execute(
-                "SELECT COUNT(*) AS c FROM books WHERE user_id = ?",
-                (user_id,)  # ADD FILTER
-            ).fetchone()
-            total_books = total_row["c"] if total_row else 0
-
-            # Genres + counts for this user
-            genre_rows = conn.execute("""
-                SELECT
-                    COALESCE(NULLIF(TRIM(genre), ''), 'Uncategorized') AS genre_label,
-                    COUNT(*) AS count
-                FROM books
-                WHERE user_id = ?
-                GROUP BY genre_label
-                ORDER BY count DESC, genre_label ASC
-            """, (user_id,)).fetchall()  # ADD FILTER
-
-            # Authors + counts for this user
-            author_rows = conn.execute("""
-                SELECT
-                    author,
-                    COUNT(*) AS count
-                FROM books
-                WHERE user_id = ?
-                GROUP BY author
-                ORDER BY count DESC, author ASC
-            """, (user_id,)).fetchall()  # ADD FILTER
+        with _INDEX_CACHE_LOCK:
+            cached = _INDEX_CACHE.get(user_id)
 
-            return render_template(
-                "index.html",
-                total_books=total_books,
-                genre_stats=genre_rows,
-                author_stats=author_rows,
-            )
+        if cached and time.time() - cached[0] < INDEX_CACHE_TTL:
+            total_books, genre_rows, author_rows = cached[1]
+        else:
+            total_books, genre_rows, author_rows = _load_library_stats(user_id)
+            with _INDEX_CACHE_LOCK:
+                _INDEX_CACHE[user_id] = (time.time(), (total_books, genre_rows, author_rows))
+
+        return render_template(
+            "index.html",
+            total_books=total_books,
+            genre_stats=genre_rows,
+            author_stats=author_rows,
+        )
     except Exception as e:
         logger.error(f"Error loading index: {e}", exc_info=True)
         return "An error occurred loading the page", 500
 
 
+SQL_GENRE_BY_ISBN = """
+    SELECT genre FROM books
+    WHERE isbn = ? AND user_id = ? AND COALESCE(genre, '') NOT IN ('', 'Uncategorized')
+    UNION ALL
+    SELECT genre FROM isbn_cache
+    WHERE isbn = ? AND COALESCE(genre, '') NOT IN ('', 'Uncategorized')
+    LIMIT 1
+"""
+
+
+def get_genre_by_isbn(isbn: str, user_id):
+    """Genre already known for this ISBN (the user's own books, then isbn_cache), or None."""
+    with get_db_connection() as conn:
+        row = execute_prepared(
+            conn, "genre_by_isbn", SQL_GENRE_BY_ISBN, (isbn, user_id, isbn)
+        ).fetchone()
+    return row["genre"] if row else None
+
+
+# A duplicate ISBN for the user inserts nothing and returns no row
+SQL_INSERT_BOOK = """
+    INSERT INTO books (isbn, title, author, cover_url, genre, user_id) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+    RETURNING id
+"""
+
+# Books saved without a genre or cover are filled in by a background thread,
+# so /add doesn't wait on the book APIs. The queue lives in this process only.
+ENRICH_QUEUE = queue.Queue(maxsize=1000)
+_ENRICH_LOCK = threading.Lock()
+_enrich_thread = None
+
+
+def _enrich_book(book_id, user_id, isbn, title, author, need_genre, need_cover):
+    """Look up a missing genre/cover for a saved book and fill in whatever is still blank."""
+    # One ISBN lookup answers both; the title/author cover search is only
+    # a fallback when that lookup has no cover
+    genre = cover_url = None
+    try:
+        _, _, cover_url, genre = fetch_book_info(isbn)
+    except Exception as e:
+        logger.error(f"Error fetching book info for ISBN {isbn}: {e}")
+    if need_cover and not cover_url:
+        try:
+            cover_url = fetch_cover_by_title_author(title, author)
+        except Exception as e:
+            logger.error(f"Error fetching cover for {title}: {e}")
+
+    if genre or cover_url:
+        # Leave anything the user set in the meantime alone
+        with get_db_connection() as conn, write_transaction(conn):
+            conn.execute("""
+                UPDATE books
+                SET genre = COALESCE(NULLIF(genre, ''), ?, genre),
+                    cover_url = COALESCE(NULLIF(cover_url, ''), ?, cover_url)
+                WHERE id = ?
+            """, (genre, cover_url, book_id))
+        _invalidate_index_cache(user_id)
+
+
+def _enrich_worker():
+    while True:
+        job = ENRICH_QUEUE.get()
+        try:
+            _enrich_book(*job)
+        except Exception as e:
+            logger.error(f"Error enriching book {job[0]}: {e}", exc_info=True)
+        finally:
+            ENRICH_QUEUE.task_done()
+
+
+def _queue_enrichment(*job):
+    """Hand a job to the enrichment thread, starting it on first use (i.e. after any fork)."""
+    global _enrich_thread
+    with _ENRICH_LOCK:
+        if _enrich_thread is None or not _enrich_thread.is_alive():
+            _enrich_thread = threading.Thread(target=_enrich_worker, name="enrich-books", daemon=True)
+            _enrich_thread.start()
+
+    try:
+        ENRICH_QUEUE.put_nowait(job)
+    except queue.Full:
+        # Backlogged: do it now rather than drop it
+        logger.warning(f"Enrichment queue full, enriching book {job[0]} inline")
+        _enrich_book(*job)
+
+
 @app.route("/add", methods=["GET", "POST"])
 @require_login
 def add_book():
@@ -579,36 +1460,36 @@ def add_book():
         if not title or not author:
             return jsonify({"error": "Missing title/author in request"}), 400
 
-        # If genre is still blank, try to infer it.
+        # A genre we already know is a single indexed lookup; only a truly
+        # unknown one is left for the background lookup below
         if not genre:
             try:
-                _, _, _, g = fetch_book_info(isbn)
-                if g:
-                    genre = g
-            except Exception as e:
-                logger.error(f"Error fetching genre for ISBN {isbn}: {e}")
-
-        # Optional: still try to fetch a cover if we have none
-        if (not cover_url) and title and author:
-            try:
-                alt_cover = fetch_cover_by_title_author(title, author)
-                if alt_cover:
-                    cover_url = alt_cover
+                genre = get_genre_by_isbn(isbn, user_id) or ""
             except Exception as e:
-                logger.error(f"Error fetching cover for {title}: {e}")
+                logger.error(f"Error looking up known genre for ISBN {isbn}: {e}")
 
         try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    "INSERT INTO books (isbn, title, author, cover_url, genre, user_id) VALUES (?, ?, ?, ?, ?, ?)",
+            with get_db_connection() as conn, write_transaction(conn):
+                inserted = execute_prepared(
+                    conn, "insert_book", SQL_INSERT_BOOK,
                     (isbn, title, author, cover_url, genre, user_id),  # ADD user_id
-                )
-                conn.commit()
-                logger.info(f"Added book: {title} (ISBN: {isbn}) for user {user_id}")
-            return jsonify({"ok": True}), 200
-        except (sqlite3.IntegrityError, psycopg2.IntegrityError):
-            logger.warning(f"Duplicate ISBN attempt: {isbn}")
-            return jsonify({"error": "This book is already in your library."}), 409
+                ).fetchone()
+
+            if inserted is None:
+                logger.warning(f"Duplicate ISBN attempt: {isbn}")
+                return jsonify({"error": "This book is already in your library."}), 409
+
+            book_id = inserted["id"]
+            logger.info(f"Added book: {title} (ISBN: {isbn}) for user {user_id}")
+            _invalidate_index_cache(user_id)
+
+            # A blank genre is inferred, and a missing cover looked up, in the
+            # background; the add page polls /api/book_status meanwhile
+            pending = not genre or not cover_url
+            if pending:
+                _queue_enrichment(book_id, user_id, isbn, title, author, not genre, not cover_url)
+
+            return jsonify({"ok": True, "id": book_id, "pending": pending}), 200
         except Exception as e:
             logger.error(f"Error adding book: {e}", exc_info=True)
             return jsonify({"error": "An error occurred adding the book"}), 500
@@ -616,6 +1497,120 @@ def add_book():
     return render_template("add.html")
 
 
+@app.route("/api/book_status/<int:book_id>")
+@require_login
+def api_book_status(book_id):
+    """Current genre/cover of one of the user's books; pending while either is still blank."""
+    user_id = session.get("user_id")
+    try:
+        with get_db_connection() as conn:
+            book = conn.execute(
+                "SELECT id, genre, cover_url FROM books WHERE id=? AND user_id=?",
+                (book_id, user_id)
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"Error loading status for book {book_id}: {e}", exc_info=True)
+        return jsonify({"error": "An error occurred"}), 500
+
+    if not book:
+        return jsonify({"error": "Book not found"}), 404
+
+    # Read from the row itself, so it's right whichever worker process (if
+    # any, after a restart) picked the job up
+    return jsonify({
+        "id": book["id"],
+        "genre": book["genre"],
+        "cover_url": book["cover_url"],
+        "pending": not book["genre"] or not book["cover_url"],
+    })
+
+
+PER_PAGE = 20
+
+
+def _cursor_from_args(prefix: str):
+    """
+    Read a (added_at, id) keyset cursor from the <prefix>_ts/<prefix>_id query
+    args. Malformed values are rejected here (falling back to the first page)
+    rather than reaching the database as a bad timestamp.
+    """
+    ts = request.args.get(f"{prefix}_ts", "")
+    book_id = request.args.get(f"{prefix}_id", type=int)
+    if not ts or book_id is None:
+        return None
+    try:
+        datetime.fromisoformat(ts)
+    except ValueError:
+        return None
+    return ts, book_id
+
+
+SQL_BOOK_COUNT = "SELECT n FROM book_counts WHERE user_id = ? AND kind = ? AND label = ?"
+
+
+def _book_count(conn, user_id, kind: str, label: str = "") -> int:
+    """Read a user's total / per-genre / per-author count from book_counts."""
+    row = execute_prepared(conn, "book_count", SQL_BOOK_COUNT, (user_id, kind, label)).fetchone()
+    return row["n"] if row else 0
+
+
+def _fetch_page(conn, name: str, from_sql: str, where_sql: str, params, total=None):
+    """Keyset-paginated page of books (aliased b): (rows, total, next_cursor, prev_cursor)."""
+    after = _cursor_from_args("after")
+    before = None if after else _cursor_from_args("before")
+    name += "_after" if after else "_before" if before else "_first"
+
+    # Without a known total (e.g. from book_counts), count alongside the rows
+    if total is None:
+        source = f"(SELECT b.*, COUNT(*) OVER () AS total_count FROM {from_sql} WHERE {where_sql}) b"
+        conditions = []
+    else:
+        source, conditions = from_sql, [where_sql]
+
+    args = list(params)
+    if after:
+        conditions.append("(b.added_at, b.id) < (?, ?)")
+        order = "b.added_at DESC, b.id DESC"
+        args.extend(after)
+    elif before:
+        conditions.append("(b.added_at, b.id) > (?, ?)")
+        order = "b.added_at ASC, b.id ASC"
+        args.extend(before)
+    else:
+        order = "b.added_at DESC, b.id DESC"
+
+    query = f"SELECT b.* FROM {source}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order} LIMIT ?"
+    args.append(PER_PAGE + 1)
+
+    rows = execute_prepared(conn, name, query, args).fetchall()
+    if total is None:
+        total = rows[0]["total_count"] if rows else 0
+    has_more = len(rows) > PER_PAGE
+    rows = rows[:PER_PAGE]
+
+    if before:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = bool(after), has_more
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = {"after_ts": str(rows[-1]["added_at"]), "after_id": rows[-1]["id"]}
+    if rows and has_prev:
+        prev_cursor = {"before_ts": str(rows[0]["added_at"]), "before_id": rows[0]["id"]}
+
+    return rows, total, next_cursor, prev_cursor
+
+
+def _search_terms(q: str):
+    """Split a search string into the word/number tokens used by the search indexes."""
+    return re.findall(r"[^\W_]+", q.lower())
+
+
 @app.route("/books")
 @require_login
 def books():
@@ -623,74 +1618,41 @@ def books():
     user_id = session.get("user_id")  # ADD THIS LINE
     q = (request.args.get("q") or "").strip()
 
-    # Pagination
-    try:
-        page = int(request.args.get("page", 1))
-        if page < 1:
-            page = 1
-    except:
-        page = 1
-
-    PER_PAGE = 20
-    offset = (page - 1) * PER_PAGE
+    name, from_sql, where_sql, params = "list_books", "books b", "b.user_id = ?", (user_id,)
+    counted = not q
+    if q:
+        name = "search_books"
+        terms = _search_terms(q)
+        if not terms:
+            # Nothing searchable in the query (e.g. only punctuation)
+            name, where_sql, params = "search_none", "1 = 0", ()
+        elif USE_POSTGRES:
+            # Every term must appear somewhere in title/author/isbn; the
+            # trigram index answers each ILIKE
+            name = f"search_books_{len(terms)}"
+            where_sql = "b.user_id = ? AND " + " AND ".join(
+                "(b.title ILIKE ? OR b.author ILIKE ? OR b.isbn ILIKE ?)" for _ in terms
+            )
+            params = (user_id, *(f"%{t}%" for t in terms for _ in range(3)))
+        else:
+            match = " ".join(f'"{t}"*' for t in terms)
+            from_sql = "books_fts f JOIN books b ON b.id = f.rowid"
+            where_sql = "books_fts MATCH ? AND b.user_id = ?"
+            params = (match, user_id)
 
     try:
         with get_db_connection() as conn:
-            if q:
-                like = f"%{q}%"
-
-                if USE_POSTGRES:
-                    total_row = conn.execute("""
-                        SELECT COUNT(*) AS c
-                        FROM books
-                        WHERE user_id = ? AND (title ILIKE ? OR author ILIKE ? OR isbn ILIKE ?)
-                    """, (user_id, like, like, like)).fetchone()  # ADD user_id FILTER
-
-                    rows = conn.execute("""
-                        SELECT *
-                        FROM books
-                        WHERE user_id = ? AND (title ILIKE ? OR author ILIKE ? OR isbn ILIKE ?)
-                        ORDER BY added_at DESC
-                        LIMIT ? OFFSET ?
-                    """, (user_id, like, like, like, PER_PAGE, offset)).fetchall()  # ADD user_id FILTER
-                else:
-                    total_row = conn.execute("""
-                        SELECT COUNT(*) AS c
-                        FROM books
-                        WHERE user_id = ? AND (LOWER(title) LIKE LOWER(?) OR LOWER(author) LIKE LOWER(?) OR LOWER(isbn) LIKE LOWER(?))
-                    """, (user_id, like, like, like)).fetchone()  # ADD user_id FILTER
-
-                    rows = conn.execute("""
-                        SELECT *
-                        FROM books
-                        WHERE user_id = ? AND (LOWER(title) LIKE LOWER(?) OR LOWER(author) LIKE LOWER(?) OR LOWER(isbn) LIKE LOWER(?))
-                        ORDER BY added_at DESC
-                        LIMIT ? OFFSET ?
-                    """, (user_id, like, like, like, PER_PAGE, offset)).fetchall()  # ADD user_id FILTER
-
-            else:
-                total_row = conn.execute(
-                    "SELECT COUNT(*) AS c FROM books WHERE user_id = ?",
-                    (user_id,)  # ADD FILTER
-                ).fetchone()
-
-                rows = conn.execute("""
-                    SELECT *
-                    FROM books
-                    WHERE user_id = ?
-                    ORDER BY added_at DESC
-                    LIMIT ? OFFSET ?
-                """, (user_id, PER_PAGE, offset)).fetchall()  # ADD FILTER
-
-            total_books = total_row["c"]
-            total_pages = max((total_books + PER_PAGE - 1) // PER_PAGE, 1)
+            total = _book_count(conn, user_id, "total") if counted else None
+            rows, total_books, next_cursor, prev_cursor = _fetch_page(
+                conn, name, from_sql, where_sql, params, total=total
+            )
 
             return render_template(
                 "books.html",
                 books=rows,
                 query=q,
-                page=page,
-                total_pages=total_pages,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
                 total_books=total_books,
             )
     except Exception as e:
@@ -704,41 +1666,22 @@ def books_by_genre(genre_label):
     """Show all books for a given genre with pagination."""
     user_id = session.get("user_id")  # ADD THIS LINE
 
-    try:
-        page = int(request.args.get("page", 1))
-        if page < 1:
-            page = 1
-    except:
-        page = 1
-
-    PER_PAGE = 20
-    offset = (page - 1) * PER_PAGE
+    where_sql = "b.user_id = ? AND b.genre_label = ?"
+    params = (user_id, genre_label)
 
     try:
         with get_db_connection() as conn:
-            total_row = conn.execute("""
-                SELECT COUNT(*) AS c
-                FROM books
-                WHERE user_id = ? AND COALESCE(NULLIF(TRIM(genre), ''), 'Uncategorized') = ?
-            """, (user_id, genre_label)).fetchone()  # ADD user_id FILTER
-
-            rows = conn.execute("""
-                SELECT *
-                FROM books
-                WHERE user_id = ? AND COALESCE(NULLIF(TRIM(genre), ''), 'Uncategorized') = ?
-                ORDER BY added_at DESC
-                LIMIT ? OFFSET ?
-            """, (user_id, genre_label, PER_PAGE, offset)).fetchall()  # ADD user_id FILTER
-
-            total_books = total_row["c"]
-            total_pages = max((total_books + PER_PAGE - 1) // PER_PAGE, 1)
+            total = _book_count(conn, user_id, "genre", genre_label)
+            rows, total_books, next_cursor, prev_cursor = _fetch_page(
+                conn, "by_genre", "books b", where_sql, params, total=total
+            )
 
             return render_template(
                 "genre_books.html",
                 books=rows,
                 genre_label=genre_label,
-                page=page,
-                total_pages=total_pages,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
                 total_books=total_books,
             )
     except Exception as e:
@@ -771,6 +1714,34 @@ def api_preview_book():
         return jsonify({"error": "Failed to fetch book information"}), 500
 
 
+@app.route("/cover/<path:isbn>")
+@require_login
+def book_cover(isbn):
+    """
+    Redirect to a book's cover image. The redirect may be kept by the user's
+    browser (private: it's per-user, so never by a shared cache) for a day,
+    so repeat views skip us but a corrected cover shows up soon.
+    """
+    user_id = session.get("user_id")
+
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT cover_url FROM books WHERE isbn = ? AND user_id = ?",
+                (isbn, user_id)
+            ).fetchone()
+    except Exception as e:
+        logger.error(f"Error loading cover for {isbn}: {e}", exc_info=True)
+        return "An error occurred", 500
+
+    if not row or not row["cover_url"]:
+        return "Cover not found", 404
+
+    resp = redirect(row["cover_url"])
+    resp.headers["Cache-Control"] = "private, max-age=86400"
+    return resp
+
+
 @app.route("/edit/<int:book_id>", methods=["GET", "POST"])
 @require_login
 def edit_book(book_id):
@@ -793,25 +1764,18 @@ def edit_book(book_id):
                 author = request.form.get("author", "").strip()
                 genre = request.form.get("genre", "").strip()
 
-                conn.execute("""
-                    UPDATE books 
-                    SET title=?, author=?, genre=?
-                    WHERE id=? AND user_id=?
-                """, (title, author, genre, book_id, user_id))  # ADD user_id CHECK
-                conn.commit()
+                with write_transaction(conn):
+                    conn.execute("""
+                        UPDATE books 
+                        SET title=?, author=?, genre=?
+                        WHERE id=? AND user_id=?
+                    """, (title, author, genre, book_id, user_id))  # ADD user_id CHECK
+                _invalidate_index_cache(user_id)
                 logger.info(f"Updated book ID {book_id} by user {user_id}")
                 return redirect(url_for("books"))
 
             # GET → show the edit form
-            GENRES = [
-                "Crime", "Comedy", "Thriller", "Fantasy", "Science Fiction", "Horror",
-                "Mystery", "Romance", "Young Adult", "Poetry", "Biography",
-                "History", "Philosophy", "Self-Help", "Business",
-                "Literary Fiction", "Non-Fiction", "Uncategorized",
-                "Anthology"
-            ]
-
-            return render_template("edit_book.html", book=book, GENRES=GENRES)
+            return render_template("edit_book.html", book=book, GENRES=GENRE_CHOICES)
     except Exception as e:
         logger.error(f"Error editing book {book_id}: {e}", exc_info=True)
         return "An error occurred", 500
@@ -834,8 +1798,9 @@ def delete_book(book_id):
                 logger.warning(f"User {user_id} attempted to delete book {book_id} they don't own")
                 return "Book not found or you don't have permission to delete it", 403
 
-            conn.execute("DELETE FROM books WHERE id=? AND user_id=?", (book_id, user_id))  # ADD user_id CHECK
-            conn.commit()
+            with write_transaction(conn):
+                conn.execute("DELETE FROM books WHERE id=? AND user_id=?", (book_id, user_id))  # ADD user_id CHECK
+            _invalidate_index_cache(user_id)
             logger.info(f"Deleted book ID {book_id} by user {user_id}")
         return redirect(url_for("books"))
     except Exception as e:
@@ -849,41 +1814,22 @@ def books_by_author(author_name):
     """Show all books for a given author with pagination."""
     user_id = session.get("user_id")  # ADD THIS LINE
 
-    try:
-        page = int(request.args.get("page", 1))
-        if page < 1:
-            page = 1
-    except:
-        page = 1
-
-    PER_PAGE = 20
-    offset = (page - 1) * PER_PAGE
+    where_sql = "b.user_id = ? AND b.author = ?"
+    params = (user_id, author_name)
 
     try:
         with get_db_connection() as conn:
-            total_row = conn.execute("""
-                SELECT COUNT(*) AS c
-                FROM books
-                WHERE user_id = ? AND author = ?
-            """, (user_id, author_name)).fetchone()  # ADD user_id FILTER
-
-            rows = conn.execute("""
-                SELECT *
-                FROM books
-                WHERE user_id = ? AND author = ?
-                ORDER BY added_at DESC
-                LIMIT ? OFFSET ?
-            """, (user_id, author_name, PER_PAGE, offset)).fetchall()  # ADD user_id FILTER
-
-            total_books = total_row["c"]
-            total_pages = max((total_books + PER_PAGE - 1) // PER_PAGE, 1)
+            total = _book_count(conn, user_id, "author", author_name)
+            rows, total_books, next_cursor, prev_cursor = _fetch_page(
+                conn, "by_author", "books b", where_sql, params, total=total
+            )
 
             return render_template(
                 "author_books.html",
                 books=rows,
                 author_name=author_name,
-                page=page,
-                total_pages=total_pages,
+                next_cursor=next_cursor,
+                prev_cursor=prev_cursor,
                 total_books=total_books,
             )
     except Exception as e:
@@ -899,10 +1845,27 @@ def logout():
     return redirect(url_for("login"))
 
 
-# Initialize database on startup
-init_db()
+@app.cli.command("init-db")
+def init_db_command():
+    """Create / migrate the database schema (e.g. as a predeploy step)."""
+    init_db()
+
+
+# Initialize database on startup. On Postgres this only happens when asked
+# (RUN_INIT_DB=1, or `flask init-db` before deploying) so every Gunicorn
+# worker doesn't re-run the schema DDL on boot; local SQLite is cheap to
+# check and keeps initializing itself.
+if os.environ.get("RUN_INIT_DB") == "1" or not USE_POSTGRES:
+    init_db()
+    # Don't carry init_db's connections into forked workers
+    if USE_POSTGRES:
+        _close_pg_pool()
+    else:
+        _close_sqlite_connection()
 
 if __name__ == "__main__":
     # Ensure debug is False in production
     debug_mode = os.environ.get("FLASK_DEBUG", "False").lower() == "true"
+    # app.run serves each request on a new thread
+    app.config["SQLITE_CONN_PER_REQUEST"] = True
     app.run(debug=debug_mode, host="0.0.0.0", port=5000)
\ No newline at end of file
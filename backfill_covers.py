@@ -1,8 +1,17 @@
-import sqlite3
-from app import DB_PATH, fetch_book_info
+from concurrent.futures import ThreadPoolExecutor
+from app import (
+    DB_PATH,
+    OPENLIBRARY_BATCH_SIZE,
+    write_transaction,
+    _fetch_from_googlebooks,
+    _fetch_openlibrary_batch,
+    _normalize_genre,
+)
+from db_utils import MAX_WORKERS, open_writer
 
-conn = sqlite3.connect(DB_PATH)
-conn.row_factory = sqlite3.Row
+# Autocommit until the writes: the SELECT doesn't hold a snapshot open
+# through the network lookups, so the app can keep writing meanwhile
+conn = open_writer(DB_PATH)
 cur = conn.cursor()
 
 rows = cur.execute(
@@ -11,21 +20,41 @@ rows = cur.execute(
 
 print(f"Found {len(rows)} books without covers.")
 
+isbns = [row["isbn"] for row in rows]
+batches = [isbns[i:i + OPENLIBRARY_BATCH_SIZE] for i in range(0, len(isbns), OPENLIBRARY_BATCH_SIZE)]
+
+with ThreadPoolExecutor(MAX_WORKERS) as ex:
+    # Open Library first, many ISBNs per request...
+    found = {}
+    for batch in ex.map(_fetch_openlibrary_batch, batches):
+        found.update({isbn: meta for isbn, meta in batch.items() if meta.get("cover_url")})
+
+    # ...then Google Books, one ISBN at a time, only for what's still missing
+    misses = [isbn for isbn in dict.fromkeys(isbns) if isbn not in found]
+    for isbn, meta in zip(misses, ex.map(_fetch_from_googlebooks, misses)):
+        if meta and meta.get("cover_url"):
+            found[isbn] = meta
+
+updates = []
 for row in rows:
-    book_id = row["id"]
-    isbn = row["isbn"]
-    print(f"Fetching cover for {isbn} (id={book_id})...")
-
-    title, author, cover_url = fetch_book_info(isbn)
-    if cover_url:
-        cur.execute(
-            "UPDATE books SET cover_url = ? WHERE id = ?",
-            (cover_url, book_id),
-        )
-        conn.commit()
-        print("  → updated.")
+    meta = found.get(row["isbn"])
+    if meta:
+        genre = _normalize_genre(meta.get("subjects") or [], title=meta.get("title"),
+                                 description=meta.get("description"))
+        updates.append((meta["cover_url"], genre, row["id"]))
+        print(f"{row['isbn']} (id={row['id']}) → cover found.")
     else:
-        print("  → no cover found.")
+        print(f"{row['isbn']} (id={row['id']}) → no cover found.")
+
+# One transaction (one commit) for all the updates instead of a commit per
+# row. The genre only fills a blank one, so edits made in the app are kept.
+with write_transaction(conn):
+    cur.executemany("""
+        UPDATE books
+        SET cover_url = COALESCE(NULLIF(?, ''), cover_url),
+            genre = COALESCE(NULLIF(genre, ''), ?)
+        WHERE id = ?
+    """, updates)
 
 conn.close()
-print("Done.")
+print(f"Done. Updated {len(updates)} books.")
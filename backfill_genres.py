@@ -1,67 +1,201 @@
 # backfill_genres.py
 
+import functools
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from app import (
+    HTTP,
     get_db_connection,
+    write_transaction,
     _fetch_from_openlibrary,
     _fetch_from_googlebooks,
     _normalize_genre,
 )
-
-def backfill_genres():
-    conn = get_db_connection()
-
-    # Find books with missing/empty/Uncategorized genre
-    rows = conn.execute("""
-        SELECT id, isbn, title, author, genre
-        FROM books
-        WHERE genre IS NULL
+from db_utils import MAX_WORKERS
+
+# ISBNs read, looked up and written per round. The read and the write are
+# each a short transaction; nothing stays open across the lookups.
+ISBN_BATCH = 500
+
+# The fetchers already share app.HTTP's pooled session. Its single quick
+# retry is sized for the add-book preview; a batch job has no such time
+# budget, so give its hosts a few backed-off retries instead of losing an
+# ISBN to one dropped connection
+for _prefix in ("https://openlibrary.org", "https://www.googleapis.com"):
+    HTTP.mount(_prefix, HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods={"GET"},
+        ),
+    ))
+
+# API answers are kept in the api_cache table for this long, so re-running
+# the backfill (after a crash, or a change to the genre rules) doesn't
+# re-fetch every ISBN
+API_CACHE_TTL = 30 * 86400  # seconds
+
+# Books updated per UPDATE ... FROM (VALUES ...) statement; keeps the bound
+# parameters well under SQLite's limits
+UPDATE_CHUNK = 500
+
+
+def ensure_api_cache():
+    with get_db_connection() as conn, write_transaction(conn):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_cache (
+                source TEXT NOT NULL,
+                isbn TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at DOUBLE PRECISION NOT NULL,
+                PRIMARY KEY (source, isbn)
+            )
+        """)
+
+
+def api_cached(source):
+    """Decorate an ISBN fetcher so its found results are stored in / served from api_cache."""
+    def decorate(fetch):
+        @functools.wraps(fetch)
+        def wrapper(isbn):
+            with get_db_connection() as conn:
+                row = conn.execute(
+                    "SELECT payload FROM api_cache WHERE source = ? AND isbn = ? AND fetched_at > ?",
+                    (source, isbn, time.time() - API_CACHE_TTL)
+                ).fetchone()
+            if row:
+                return orjson.loads(row["payload"])
+
+            # Misses aren't stored: the fetchers also return None on errors
+            meta = fetch(isbn)
+            if meta:
+                with get_db_connection() as conn, write_transaction(conn):
+                    conn.execute("""
+                        INSERT INTO api_cache (source, isbn, payload, fetched_at)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT (source, isbn) DO UPDATE
+                        SET payload = excluded.payload, fetched_at = excluded.fetched_at
+                    """, (source, isbn, orjson.dumps(meta).decode(), time.time()))
+            return meta
+        return wrapper
+    return decorate
+
+
+fetch_openlibrary = api_cached("openlibrary")(_fetch_from_openlibrary)
+fetch_googlebooks = api_cached("googlebooks")(_fetch_from_googlebooks)
+
+
+def resolve(books):
+    """
+    Look up one ISBN for all the books that share it and return a
+    (book_id, new_genre) pair for each, or [] if there's nothing better.
+    """
+    isbn = books[0]["isbn"]
+    book_ids = ", ".join(str(row["id"]) for row in books)
+
+    # 1) Try Open Library
+    meta = fetch_openlibrary(isbn)
+
+    # 2) Fallback to Google Books if needed
+    if not meta:
+        meta = fetch_googlebooks(isbn)
+
+    if not meta:
+        print(f"id={book_ids}, ISBN={isbn}: no metadata found from either API. Skipping.")
+        return []
+
+    # Extract fields needed for genre inference
+    title = meta.get("title") or ""
+    subjects = meta.get("subjects") or []
+    description = meta.get("description") or ""
+
+    # Thin metadata: nothing for _normalize_genre to match against. (The
+    # title alone can still name a genre, so only skip when it's empty too.)
+    if not (subjects or description or title):
+        print(f"id={book_ids}, ISBN={isbn}: no subjects, description or title. Skipping.")
+        return []
+
+    new_genre = _normalize_genre(subjects, title=title, description=description)
+
+    if not new_genre or new_genre == "Uncategorized":
+        print(f"id={book_ids}, ISBN={isbn}: could not infer a better genre (got {new_genre!r}). Skipping.")
+        return []
+
+    for row in books:
+        print(f"id={row['id']}, ISBN={isbn}: {row['genre']!r} → {new_genre!r}")
+    return [(row["id"], new_genre) for row in books]
+
+
+# Books with an ISBN to look up and a missing/empty/Uncategorized genre
+SQL_NEEDS_GENRE = """
+    FROM books
+    WHERE isbn IS NOT NULL AND isbn <> ''
+      AND (genre IS NULL
            OR TRIM(genre) = ''
-           OR genre = 'Uncategorized'
-    """).fetchall()
-
-    print(f"Found {len(rows)} books to backfill.")
-
-    updated = 0
+           OR genre = 'Uncategorized')
+"""
+
+# The next ISBN_BATCH ISBNs after the given one, with all their books
+SQL_NEXT_BATCH = f"""
+    SELECT id, isbn, genre {SQL_NEEDS_GENRE}
+      AND isbn IN (
+          SELECT DISTINCT isbn {SQL_NEEDS_GENRE}
+            AND isbn > ?
+          ORDER BY isbn
+          LIMIT ?
+      )
+    ORDER BY isbn, id
+"""
+
+
+def write_genres(updates):
+    """Apply (book_id, genre) pairs: one UPDATE joined against a VALUES list per UPDATE_CHUNK books, in one transaction."""
+    with get_db_connection() as conn, write_transaction(conn):
+        for i in range(0, len(updates), UPDATE_CHUNK):
+            chunk = updates[i:i + UPDATE_CHUNK]
+            placeholders = ", ".join(["(?, ?)"] * len(chunk))
+            conn.execute(f"""
+                WITH v(id, g) AS (VALUES {placeholders})
+                UPDATE books SET genre = v.g
+                FROM v
+                WHERE books.id = v.id
+            """, [value for pair in chunk for value in pair])
 
-    for row in rows:
-        book_id = row["id"]
-        isbn = row["isbn"]
-        old_genre = row["genre"]
 
-        print(f"\nProcessing id={book_id}, ISBN={isbn}, current genre={old_genre!r}")
-
-        # 1) Try Open Library
-        meta = _fetch_from_openlibrary(isbn)
-
-        # 2) Fallback to Google Books if needed
-        if not meta:
-            meta = _fetch_from_googlebooks(isbn)
-
-        if not meta:
-            print("  → No metadata found from either API. Skipping.")
-            continue
-
-        # Extract fields needed for genre inference
-        title = meta.get("title") or ""
-        subjects = meta.get("subjects") or []
-        description = meta.get("description") or ""
-
-        new_genre = _normalize_genre(subjects, title=title, description=description)
-
-        if not new_genre or new_genre == "Uncategorized":
-            print(f"  → Could not infer a better genre (got {new_genre!r}). Skipping.")
-            continue
+def backfill_genres():
+    ensure_api_cache()
 
-        print(f"  → Updating genre to {new_genre!r}")
+    with get_db_connection() as conn:
+        total = conn.execute("SELECT COUNT(*) " + SQL_NEEDS_GENRE).fetchone()[0]
+    print(f"Found {total} books to backfill.")
 
-        conn.execute(
-            "UPDATE books SET genre = ? WHERE id = ?",
-            (new_genre, book_id),
-        )
-        updated += 1
+    updated = 0
+    last_isbn = ""
+    with ThreadPoolExecutor(MAX_WORKERS) as ex:
+        while True:
+            with get_db_connection() as conn:
+                rows = conn.execute(SQL_NEXT_BATCH, (last_isbn, ISBN_BATCH)).fetchall()
+            if not rows:
+                break
+            last_isbn = rows[-1]["isbn"]
+
+            # Sorted by ISBN, so the copies of a book (one per user) are
+            # adjacent and looked up once
+            by_isbn = [list(group) for _, group in itertools.groupby(rows, key=lambda row: row["isbn"])]
+            updates = [pair for pairs in ex.map(resolve, by_isbn) for pair in pairs]
+            if updates:
+                write_genres(updates)
+            updated += len(updates)
 
-    conn.commit()
-    conn.close()
     print(f"\nDone. Updated {updated} books.")
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+# db_utils.py
+import sqlite3
+
+# The standalone scripts' API lookups are network-bound, so they run several
+# at once (sharing app.HTTP's pooled keep-alive connections)
+MAX_WORKERS = 16
+
+
+def open_writer(path):
+    """
+    Open a SQLite connection set up for a standalone script's bulk writes:
+    WAL, synchronous=NORMAL and temp tables in memory. It starts in
+    autocommit mode, so reads before the writes don't pin a snapshot (or
+    hold back WAL checkpoints) while the script does slow work; wrap the
+    writes themselves in app.write_transaction().
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(
+        "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY"
+    )
+    return conn
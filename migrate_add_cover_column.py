@@ -1,15 +1,17 @@
-import sqlite3
-from app import DB_PATH  # reuse the same DB path
+from app import DB_PATH, write_transaction  # reuse the same DB path
+from db_utils import open_writer
 
-conn = sqlite3.connect(DB_PATH)
+conn = open_writer(DB_PATH)
 cur = conn.cursor()
 
-try:
-    cur.execute("ALTER TABLE books ADD COLUMN cover_url TEXT")
-    conn.commit()
-    print("✅ Added cover_url column to books table.")
-except sqlite3.OperationalError as e:
-    # If you run it twice you'll get "duplicate column name" – that's fine
-    print("⚠️ Could not add column (maybe it already exists?):", e)
+# Holds the write lock from the check to the COMMIT, so two copies of this
+# script can't both decide the column is missing
+with write_transaction(conn):
+    cols = {row["name"] for row in cur.execute("PRAGMA table_info(books)")}
+    if "cover_url" in cols:
+        print("cover_url column already exists; nothing to do.")
+    else:
+        cur.execute("ALTER TABLE books ADD COLUMN cover_url TEXT")
+        print("✅ Added cover_url column to books table.")
 
 conn.close()
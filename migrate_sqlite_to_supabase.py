@@ -1,10 +1,83 @@
+import io
 import os
+import queue
 import sqlite3
+import struct
+import threading
+from datetime import datetime, timezone
 import psycopg2
-import psycopg2.extras
 
 DB_PATH = os.path.join("db", "books.db")
 
+# Rows read from SQLite and held in memory before being sent as one COPY
+BATCH_SIZE = 10000
+# Encoded batches the SQLite reader may get ahead of the Postgres writer
+QUEUE_DEPTH = 4
+
+COLUMNS = ("isbn", "title", "author", "cover_url", "genre", "added_at")
+
+# Binary COPY framing: signature, flags, header extension length
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+PGCOPY_TRAILER = struct.pack(">h", -1)
+PG_EPOCH = datetime(2000, 1, 1)
+
+
+def _timestamp_field(value):
+    """SQLite's added_at text -> binary TIMESTAMP (microseconds since 2000-01-01)."""
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = dt - PG_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack(">iq", 8, micros)
+
+
+def _binary_copy_buffer(rows):
+    """
+    Encode rows of COLUMNS in Postgres' binary COPY format, so the server
+    stores the values directly instead of parsing text for every field.
+    """
+    buf = io.BytesIO()
+    buf.write(PGCOPY_HEADER)
+    field_count = struct.pack(">h", len(COLUMNS))
+    null = struct.pack(">i", -1)
+    for row in rows:
+        buf.write(field_count)
+        *texts, added_at = row
+        for value in texts:
+            if value is None:
+                buf.write(null)
+                continue
+            if isinstance(value, str):
+                data = value.encode("utf-8")
+            elif isinstance(value, bytes):
+                # A BLOB in a TEXT column: already the bytes to store
+                data = value
+            else:
+                raise TypeError(f"can't COPY {type(value).__name__} value {value!r} as text")
+            buf.write(struct.pack(">i", len(data)))
+            buf.write(data)
+        buf.write(null if added_at is None else _timestamp_field(added_at))
+    buf.write(PGCOPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def _produce_batches(cursor, out):
+    """
+    Reader thread: fetch the SQLite cursor's rows BATCH_SIZE at a time,
+    encode each batch into a COPY buffer and put it on `out`; then None, or
+    the exception that stopped the scan, so the writer always finds out
+    it's over.
+    """
+    try:
+        cursor.arraysize = BATCH_SIZE
+        while batch := cursor.fetchmany():
+            out.put(_binary_copy_buffer(batch))
+        out.put(None)
+    except BaseException as exc:
+        out.put(exc)
+
 
 def main():
     database_url = os.environ.get("DATABASE_URL")
@@ -15,18 +88,26 @@ def main():
         raise FileNotFoundError(f"Local SQLite DB not found at {DB_PATH}")
 
     # 1. Read from local SQLite
-    sqlite_conn = sqlite3.connect(DB_PATH)
-    sqlite_conn.row_factory = sqlite3.Row
+    # (scanned from the reader thread below, never concurrently with this one)
+    sqlite_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # No row_factory: the columns are read by position, and plain tuples are
+    # cheaper to build and index than sqlite3.Row
+    # Read-only export: memory-map the file and give it a large page cache
+    # so the full-table scan skips most read() calls; query_only guards
+    # against writing to the source by accident
+    sqlite_conn.execute("PRAGMA mmap_size=268435456")
+    sqlite_conn.execute("PRAGMA cache_size=-65536")
+    sqlite_conn.execute("PRAGMA temp_store=MEMORY")
+    sqlite_conn.execute("PRAGMA query_only=ON")
     cur_sqlite = sqlite_conn.cursor()
 
-    rows = cur_sqlite.execute(
-        "SELECT isbn, title, author, cover_url, genre, added_at FROM books"
-    ).fetchall()
-
-    print(f"Found {len(rows)} books in local SQLite.")
+    total = cur_sqlite.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+    print(f"Found {total} books in local SQLite.")
 
     # 2. Connect to Supabase Postgres (via pooler URL)
-    pg_conn = psycopg2.connect(database_url, cursor_factory=psycopg2.extras.RealDictCursor)
+    pg_conn = psycopg2.connect(database_url)
+    # Explicit: the staging and insert share one transaction, committed once
+    pg_conn.autocommit = False
     pg_cur = pg_conn.cursor()
 
     # Make sure the books table exists (init_db will also do this on the server)
@@ -43,26 +124,90 @@ def main():
     """)
     pg_conn.commit()
 
-    inserted = 0
+    # Don't wait for the WAL flush at the final commit. Safe because the load
+    # is idempotent: a first load is all-or-nothing, and a re-run skips the
+    # rows already there (ON CONFLICT DO NOTHING), so if a crash loses the
+    # tail of the commit, just run the migration again. LOCAL scopes it to
+    # this transaction, which also holds up behind a transaction pooler.
+    pg_cur.execute("SET LOCAL synchronous_commit TO OFF")
 
-    for row in rows:
-        try:
-            pg_cur.execute("""
-                INSERT INTO books (isbn, title, author, cover_url, genre, added_at)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (isbn) DO NOTHING
-            """, (
-                row["isbn"],
-                row["title"],
-                row["author"],
-                row["cover_url"],
-                row["genre"],
-                row["added_at"],
-            ))
-            if pg_cur.rowcount == 1:
-                inserted += 1
-        except Exception as e:
-            print(f"Error inserting ISBN {row['isbn']}: {e}")
+    # Stream the rows from SQLite BATCH_SIZE at a time (so the whole
+    # library never sits in memory) into a temporary staging table with
+    # binary COPY, then move them into books with one INSERT ... SELECT that
+    # keeps one row per ISBN. Everything is one transaction, committed once
+    # below.
+    pg_cur.execute("""
+        CREATE TEMP TABLE books_stage (
+            isbn TEXT,
+            title TEXT,
+            author TEXT,
+            cover_url TEXT,
+            genre TEXT,
+            added_at TIMESTAMP,
+            -- arrival order (COPY fills it row by row), i.e. SQLite id order
+            seq BIGSERIAL
+        ) ON COMMIT DROP
+    """)
+    copy_sql = f"COPY books_stage ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT binary)"
+
+    # A reader thread scans SQLite while this one COPYs the previous batch,
+    # so the disk read and the network write overlap; the bounded queue
+    # keeps at most QUEUE_DEPTH batches in memory
+    batches = queue.Queue(maxsize=QUEUE_DEPTH)
+    reader = threading.Thread(
+        target=_produce_batches,
+        args=(cur_sqlite.execute(f"SELECT {', '.join(COLUMNS)} FROM books ORDER BY id"), batches),
+        daemon=True,
+    )
+    reader.start()
+    while (buf := batches.get()) is not None:
+        if isinstance(buf, BaseException):
+            raise buf
+        pg_cur.copy_expert(copy_sql, buf)
+    reader.join()
+
+    columns = ", ".join(COLUMNS)
+    pg_cur.execute("SELECT NOT EXISTS (SELECT 1 FROM books)")
+    first_load = pg_cur.fetchone()[0]
+    pg_cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conrelid = 'books'::regclass AND conname = 'books_isbn_key'
+        )
+    """)
+    has_isbn_key = pg_cur.fetchone()[0]
+    if first_load and has_isbn_key:
+        # Empty target: rather than probing the isbn index once per row, drop
+        # the unique constraint, insert one row per ISBN (the first in SQLite
+        # id order, and every ISBN-less row, which is what ON CONFLICT keeps)
+        # and rebuild the index in one sorted pass. This is inside the
+        # transaction, so readers never see books without it.
+        pg_cur.execute("ALTER TABLE books DROP CONSTRAINT books_isbn_key")
+        pg_cur.execute(f"""
+            INSERT INTO books ({columns})
+            SELECT {columns} FROM (
+                (SELECT DISTINCT ON (isbn) {columns}, seq
+                 FROM books_stage
+                 WHERE isbn IS NOT NULL
+                 ORDER BY isbn, seq)
+                UNION ALL
+                SELECT {columns}, seq FROM books_stage WHERE isbn IS NULL
+            ) AS kept
+            ORDER BY seq
+        """)
+        inserted = pg_cur.rowcount
+        pg_cur.execute("ALTER TABLE books ADD CONSTRAINT books_isbn_key UNIQUE (isbn)")
+    else:
+        # Skips rows that would break any unique constraint books has
+        # (books_isbn_key on the legacy schema); in SQLite id order
+        pg_cur.execute(f"""
+            INSERT INTO books ({columns})
+            SELECT {columns} FROM books_stage
+            ORDER BY seq
+            ON CONFLICT DO NOTHING
+        """)
+        # A single statement, so rowcount is exactly the number of new books
+        inserted = pg_cur.rowcount
 
     pg_conn.commit()
     print(f"Inserted {inserted} new books into Supabase.")